@@ -1,9 +1,24 @@
+from __future__ import annotations
+
 import os
 from datetime import datetime
 import subprocess
 from pathlib import Path
 import shutil
+import stat
 import sys
+import argparse
+import json
+import hashlib
+import mmap
+import threading
+import time
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
+
+# Dropbox folder that holds the reports, Brewfiles and monthly snapshots
+OUTPUT_DIR = Path(os.path.expanduser("~/Library/CloudStorage/Dropbox/Mac Installed Apps"))
 
 def get_brew_packages(brewfile_path: str):
     try:
@@ -58,12 +73,137 @@ def get_mas_apps():
     except Exception:
         return []
 
+# ---- Copy engine ----
+# Each file is copied with the cheapest strategy the filesystem supports:
+#   clone    - FICLONE ioctl (Linux btrfs/xfs) or clonefile() (APFS), no data is copied
+#   kernel   - os.copy_file_range / os.sendfile, data never passes through user space
+#   buffered - plain read/write loop (shutil.copyfileobj)
+# Directory copies are fanned out over a thread pool since most of the cost is
+# per-file syscalls (fonts, snippets, Sublime packages are many small files).
+
+COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_FICLONE = 0x40049409  # _IOW(0x94, 9, int) from <linux/fs.h>
+
+# libc is only needed for clonefile() on macOS; load it once rather than per file
+_libc = None
+if sys.platform == 'darwin':
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    except OSError:
+        _libc = None
+
+_copy_stats_lock = threading.Lock()
+_copy_stats = {"strategies": {}, "seconds": 0.0}  # strategies: name -> [files, bytes]
+
+
+def reset_copy_stats():
+    """Clear the strategy / throughput counters collected by the copy engine."""
+    with _copy_stats_lock:
+        _copy_stats["strategies"] = {}
+        _copy_stats["seconds"] = 0.0
+
+
+def _record_copy(strategy: str, nbytes: int):
+    with _copy_stats_lock:
+        counts = _copy_stats["strategies"].setdefault(strategy, [0, 0])
+        counts[0] += 1
+        counts[1] += nbytes
+
+
+def copy_stats_summary() -> str:
+    """Return a one-line summary of copy strategies used and throughput achieved.
+
+    Clones move no data, so their bytes are listed separately and left out of the MB/s figure.
+    """
+    with _copy_stats_lock:
+        seconds = _copy_stats["seconds"]
+        strategies = {name: tuple(counts) for name, counts in _copy_stats["strategies"].items()}
+    files = sum(count for count, _ in strategies.values())
+    if not files:
+        return "Copy engine: no files copied"
+    mib = 1024 * 1024
+    used = ', '.join(f"{name} x{count} ({nbytes / mib:.1f} MB)" for name, (count, nbytes) in sorted(strategies.items()))
+    copied = sum(nbytes for name, (_, nbytes) in strategies.items() if name != 'clone')
+    rate = f"{copied / mib / seconds:.1f} MB/s" if seconds > 0 and copied else "n/a"
+    return f"Copy engine: {files} files in {seconds:.2f}s, {copied / mib:.1f} MB copied ({rate}) — {used}"
+
+
+def _clone_file(src: Path, dst: Path) -> bool:
+    """Try a copy-on-write clone of src to dst. Returns True if the filesystem supports it."""
+    if sys.platform == 'darwin':
+        if _libc is None:
+            return False
+        try:
+            if dst.exists() or dst.is_symlink():
+                dst.unlink()
+            # int clonefile(const char *src, const char *dst, int flags)
+            return _libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+        except Exception:
+            return False
+    if sys.platform.startswith('linux'):
+        try:
+            import fcntl
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return True
+        except Exception:
+            return False
+    return False
+
+
+def _kernel_copy(src: Path, dst: Path, size: int) -> bool:
+    """Copy src to dst in the kernel via copy_file_range, falling back to sendfile."""
+    for fn in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if fn is None:
+            continue
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+                copied = 0
+                while copied < size:
+                    if fn is os.sendfile:
+                        n = fn(out_fd, in_fd, copied, size - copied)
+                    else:
+                        n = fn(in_fd, out_fd, size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            if copied == size:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def copy_file_fast(src: Path, dst: Path) -> str:
+    """Copy src to dst (with metadata) and return the strategy used: clone, kernel or buffered."""
+    st = src.stat()
+    if not stat.S_ISREG(st.st_mode):
+        # Opening a FIFO would block forever; refuse like shutil.copyfile does
+        raise shutil.SpecialFileError(f"`{src}` is not a regular file")
+    size = st.st_size
+    if _clone_file(src, dst):
+        strategy = 'clone'
+    elif size and _kernel_copy(src, dst, size):
+        strategy = 'kernel'
+    else:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+        strategy = 'buffered'
+    shutil.copystat(src, dst)
+    _record_copy(strategy, size)
+    return strategy
+
+
 def safe_copy_file(src: Path, dest_dir: Path) -> bool:
     """Copy a single file into dest_dir. Returns True if copied."""
     try:
         if src.exists() and src.is_file():
             dest_dir.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(src, dest_dir / src.name)
+            start = time.perf_counter()
+            copy_file_fast(src, dest_dir / src.name)
+            with _copy_stats_lock:
+                _copy_stats["seconds"] += time.perf_counter() - start
             return True
     except Exception:
         pass
@@ -71,20 +211,198 @@ def safe_copy_file(src: Path, dest_dir: Path) -> bool:
 
 
 def safe_copy_dir(src: Path, dest_dir: Path) -> bool:
-    """Copy a directory into dest_dir/<src.name>. Returns True if copied."""
+    """Copy a directory into dest_dir/<src.name> using a worker pool. Returns True if copied."""
     try:
         if src.exists() and src.is_dir():
             dest_dir.mkdir(parents=True, exist_ok=True)
             target = dest_dir / src.name
             if target.exists():
                 shutil.rmtree(target)
-            shutil.copytree(src, target)
+            start = time.perf_counter()
+            # Create the directory tree first, then copy files in parallel.
+            # Symlinks are followed, matching shutil.copytree's default. Only regular
+            # files are copied: pipes, sockets, devices and broken links are skipped.
+            pairs = []
+            for root, dirs, files in os.walk(src, followlinks=True):
+                rel = Path(root).relative_to(src)
+                (target / rel).mkdir(parents=True, exist_ok=True)
+                for name in files:
+                    p = Path(root) / name
+                    try:
+                        if not stat.S_ISREG(os.stat(p).st_mode):
+                            continue
+                    except OSError:
+                        continue
+                    pairs.append((p, target / rel / name))
+            with ThreadPoolExecutor(max_workers=COPY_WORKERS) as pool:
+                for future in [pool.submit(copy_file_fast, s, d) for s, d in pairs]:
+                    future.result()
+            # Directory mtimes are only final once every file inside has been written
+            for root, dirs, files in os.walk(src, topdown=False, followlinks=True):
+                rel = Path(root).relative_to(src)
+                shutil.copystat(root, target / rel)
+            with _copy_stats_lock:
+                _copy_stats["seconds"] += time.perf_counter() - start
             return True
     except Exception:
         pass
     return False
 
 
+# ---- Integrity manifest ----
+# MANIFEST.json records size, mtime and content hash of every file in a snapshot so a
+# Dropbox-synced copy can be checked before relying on it for a restore.
+
+INTEGRITY_MANIFEST = 'MANIFEST.json'
+HASH_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+MMAP_THRESHOLD = 8 * 1024 * 1024  # hash files at least this big through mmap
+
+
+def hash_file(path: Path, algorithm: str = 'blake2b') -> str:
+    """Return the hex digest of path. Large files are mapped instead of read in chunks."""
+    h = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h.update(mm)
+        else:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _scan_snapshot_files(snapshot_dir: Path) -> dict:
+    """Return {relative posix path: os.stat_result} for every regular file in snapshot_dir."""
+    files = {}
+    for root, dirs, names in os.walk(snapshot_dir):
+        for name in names:
+            p = Path(root) / name
+            if p.is_symlink() or not p.is_file():
+                continue
+            rel = p.relative_to(snapshot_dir).as_posix()
+            if rel == INTEGRITY_MANIFEST:
+                continue
+            files[rel] = p.stat()
+    return files
+
+
+def load_integrity_manifest(snapshot_dir: Path) -> dict:
+    """Load MANIFEST.json from snapshot_dir. Returns {} if missing or unreadable."""
+    try:
+        with open(snapshot_dir / INTEGRITY_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def write_integrity_manifest(snapshot_dir: Path, algorithm: str = 'blake2b',
+                             previous_snapshot: Path | None = None) -> dict:
+    """Hash every file in snapshot_dir on a thread pool and write MANIFEST.json.
+
+    Hashes are reused for files whose path, size and mtime match an entry in the
+    snapshot's own earlier MANIFEST.json (same-month re-run) or in previous_snapshot's
+    (last month). The copy engine preserves mtimes, so unchanged files only get hashed
+    once. Returns {"files", "hashed", "reused", "bytes"}.
+    """
+    sources = []
+    for d in (snapshot_dir, previous_snapshot):
+        if d is None:
+            continue
+        manifest = load_integrity_manifest(d)
+        if manifest.get('algorithm') == algorithm:
+            sources.append(manifest.get('files', {}))
+
+    entries = {}
+    to_hash = []
+    for rel, st in _scan_snapshot_files(snapshot_dir).items():
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        for files in sources:
+            old = files.get(rel)
+            if old and old.get('size') == st.st_size and old.get('mtime_ns') == st.st_mtime_ns and old.get('hash'):
+                entry["hash"] = old['hash']
+                break
+        else:
+            to_hash.append(rel)
+        entries[rel] = entry
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        digests = pool.map(lambda rel: hash_file(snapshot_dir / rel, algorithm), to_hash)
+        for rel, digest in zip(to_hash, digests):
+            entries[rel]["hash"] = digest
+
+    manifest = {
+        "created": datetime.now().isoformat(),
+        "algorithm": algorithm,
+        "files": dict(sorted(entries.items())),
+    }
+    with open(snapshot_dir / INTEGRITY_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+
+    return {
+        "files": len(entries),
+        "hashed": len(to_hash),
+        "reused": len(entries) - len(to_hash),
+        "bytes": sum(e["size"] for e in entries.values()),
+    }
+
+
+def verify_snapshot(snapshot_dir: Path) -> dict:
+    """Re-hash snapshot_dir in parallel and compare it against its MANIFEST.json.
+
+    Returns {"ok": [...], "missing": [...], "extra": [...], "corrupted": [...]}.
+    Raises FileNotFoundError if the snapshot has no readable manifest.
+    """
+    manifest = load_integrity_manifest(snapshot_dir)
+    if not manifest:
+        raise FileNotFoundError(f"No {INTEGRITY_MANIFEST} in {snapshot_dir}")
+    algorithm = manifest.get('algorithm', 'blake2b')
+    expected = manifest.get('files', {})
+    actual = _scan_snapshot_files(snapshot_dir)
+
+    report = {
+        "ok": [],
+        "missing": sorted(set(expected) - set(actual)),
+        "extra": sorted(set(actual) - set(expected)),
+        "corrupted": [],
+    }
+
+    # A size mismatch is already corruption; only re-hash files that could still match
+    common = sorted(set(expected) & set(actual))
+    to_hash = []
+    for rel in common:
+        if actual[rel].st_size != expected[rel].get('size'):
+            report["corrupted"].append(rel)
+        else:
+            to_hash.append(rel)
+
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        futures = {rel: pool.submit(hash_file, snapshot_dir / rel, algorithm) for rel in to_hash}
+        for rel, future in futures.items():
+            try:
+                matches = future.result() == expected[rel].get('hash')
+            except OSError:
+                matches = False
+            report["ok" if matches else "corrupted"].append(rel)
+
+    report["corrupted"].sort()
+    return report
+
+
+def find_snapshots(output_dir: Path) -> list[Path]:
+    """Return snapshot-<MM-YY> folders in output_dir, oldest first."""
+    snapshots = []
+    for p in output_dir.glob('snapshot-*'):
+        try:
+            month = datetime.strptime(p.name[len('snapshot-'):], '%m-%y')
+        except ValueError:
+            continue
+        if p.is_dir():
+            snapshots.append((month, p))
+    return [p for _, p in sorted(snapshots)]
+
+
 def run_cmd_to_file(cmd: list[str], outfile: Path) -> bool:
     """Run a command and write stdout to outfile. Returns True on success."""
     try:
@@ -114,6 +432,7 @@ def export_env_snapshot(output_dir: Path, current_date: str) -> dict:
     }
 
     home = Path(os.path.expanduser('~'))
+    reset_copy_stats()
 
     # ---- SSH (public keys only) ----
     ssh_dir = home / '.ssh'
@@ -246,7 +565,6 @@ def export_env_snapshot(output_dir: Path, current_date: str) -> dict:
         # List all envs
         env_list_result = subprocess.run([conda_path, 'env', 'list', '--json'], capture_output=True, text=True)
         if env_list_result.returncode == 0:
-            import json
             try:
                 env_data = json.loads(env_list_result.stdout)
                 env_paths = env_data.get('envs', [])
@@ -319,6 +637,20 @@ def export_env_snapshot(output_dir: Path, current_date: str) -> dict:
     if run_cmd_to_file([sys.executable, '-m', 'pip', 'freeze'], py_dir / 'pip-freeze.txt'):
         results["exported"].append('python/pip-freeze.txt')
 
+    # ---- Git bundles of unpushed work in ~/PythonProjects ----
+    bundle_dir = snapshot_dir / 'git_bundles'
+    if bundle_dir.exists():
+        shutil.rmtree(bundle_dir)  # re-run in the same month: rebuild from scratch
+    previous_bundle_dirs = [p / 'git_bundles' for p in find_snapshots(output_dir) if p != snapshot_dir]
+    for info in export_git_bundles(home / 'PythonProjects', bundle_dir, previous_bundle_dirs):
+        if info["status"] == "bundled":
+            results["exported"].append(f"git_bundles/{info['name']}.bundle ({info['commits']} commits)")
+        elif info["status"] == "too-large":
+            results["notes"].append(
+                f"git bundle for {info['name']} skipped: {info['bytes'] / (1024 * 1024):.0f} MB exceeds size cap.")
+        elif info["status"] == "failed":
+            results["notes"].append(f"git bundle for {info['name']} failed.")
+
     # ---- Directory layout map (non-Dropbox) ----
     try:
         generate_directory_map(home, snapshot_dir)
@@ -326,6 +658,8 @@ def export_env_snapshot(output_dir: Path, current_date: str) -> dict:
     except Exception:
         results["notes"].append('Failed to generate directory map')
 
+    results["copy_stats"] = copy_stats_summary()
+
     # Manifest
     manifest = snapshot_dir / 'MANIFEST.md'
     with open(manifest, 'w', encoding='utf-8') as m:
@@ -348,19 +682,32 @@ def export_env_snapshot(output_dir: Path, current_date: str) -> dict:
         m.write("- System: computer name / hostname\n")
         m.write("- launchd: ~/Library/LaunchAgents\n")
         m.write("- macOS defaults: a few common domains\n")
-        m.write("- Python: pip freeze for the interpreter running this script\n\n")
+        m.write("- Python: pip freeze for the interpreter running this script\n")
+        m.write("- Git bundles: unpushed branches, tags and stashes of ~/PythonProjects repos\n")
+        m.write(f"- Integrity: {INTEGRITY_MANIFEST} with size + hash of every file (check with `python3 app_lister.py verify <this folder>` from a clone of github.com/alexkharrod/app_lister)\n\n")
         m.write("## Copied\n")
         for item in results['copied']:
             m.write(f"- {item}\n")
         m.write("\n## Exported\n")
         for item in results['exported']:
             m.write(f"- {item}\n")
+        m.write(f"\n{results['copy_stats']}\n")
         if results['notes']:
             m.write("\n## Notes\n")
             for n in results['notes']:
                 m.write(f"- {n}\n")
 
     results["exported"].append('MANIFEST.md')
+
+    # Integrity manifest last, so it covers everything written above (including MANIFEST.md)
+    try:
+        earlier = [p for p in find_snapshots(output_dir) if p != snapshot_dir]
+        results["integrity"] = write_integrity_manifest(
+            snapshot_dir, previous_snapshot=earlier[-1] if earlier else None)
+        results["exported"].append(INTEGRITY_MANIFEST)
+    except Exception as e:
+        results["integrity"] = None
+        results["notes"].append(f"Failed to write {INTEGRITY_MANIFEST}: {e}")
     return results
 
 def generate_directory_map(home: Path, snapshot_dir: Path, max_depth: int = 3):
@@ -428,6 +775,366 @@ def collect_python_project_repos(projects_dir: Path) -> list[dict]:
     return repos
 
 
+# ---- Git bundles (unpushed work) ----
+# Each repo gets git_bundles/<folder>.bundle holding only the branches, tags and stashes
+# that are neither on a remote nor already in an earlier month's bundle. Restoring replays
+# the bundles oldest-first on top of a fresh clone.
+
+GIT_BUNDLE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+GIT_BUNDLE_MAX_BYTES = 200 * 1024 * 1024
+STASH_REF_PREFIX = 'refs/app-lister/stash'
+
+
+def _git(repo: Path, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(['git', '-C', str(repo), *args], capture_output=True, text=True)
+
+
+def export_git_bundle(repo: Path, bundle_file: Path, previous_bundles: list[Path] | None = None,
+                      max_bytes: int = GIT_BUNDLE_MAX_BYTES) -> dict:
+    """Bundle the unpushed work in repo into bundle_file.
+
+    Stashes are bundled through temporary refs/app-lister/stash/<order>-<sha> refs, which
+    are removed again before returning. Returns {"name", "status", "bundle", "bytes",
+    "commits"} where status is one of: bundled, up-to-date, too-large, failed.
+    """
+    info = {"name": repo.name, "status": "failed", "bundle": None, "bytes": 0, "commits": 0}
+
+    # Exclude everything on any remote, plus whatever earlier bundles already hold. All of
+    # them are needed, not just last month's: an unchanged stash is only in the bundle of
+    # the month it first appeared.
+    exclude = ['--remotes']
+    for previous in previous_bundles or []:
+        if not previous.exists():
+            continue
+        heads = _git(repo, 'bundle', 'list-heads', str(previous))
+        for line in heads.stdout.splitlines():
+            sha = line.split(' ', 1)[0]
+            if sha not in exclude and _git(repo, 'cat-file', '-e', f"{sha}^{{commit}}").returncode == 0:
+                exclude.append(sha)
+
+    stash_refs = []
+    try:
+        stashes = _git(repo, 'stash', 'list', '--format=%H')
+        for n, sha in enumerate(stashes.stdout.split()):
+            # Counted down from stash@{0} so sorting by refname gives oldest first on
+            # restore; the commit keeps refs from different months from colliding
+            ref = f"{STASH_REF_PREFIX}/{9999 - n:04d}-{sha}"
+            if _git(repo, 'update-ref', ref, sha).returncode == 0:
+                stash_refs.append(ref)
+
+        include = ['--branches', '--tags', *stash_refs]
+        count = _git(repo, 'rev-list', '--count', *include, '--not', *exclude)
+        if count.returncode != 0:
+            return info
+        info["commits"] = int(count.stdout.strip() or 0)
+        if info["commits"] == 0:
+            info["status"] = "up-to-date"
+            return info
+
+        bundle_file.parent.mkdir(parents=True, exist_ok=True)
+        result = _git(repo, 'bundle', 'create', str(bundle_file), *include, '--not', *exclude)
+        if result.returncode != 0 or not bundle_file.exists():
+            return info
+
+        info["bytes"] = bundle_file.stat().st_size
+        if info["bytes"] > max_bytes:
+            bundle_file.unlink()
+            info["status"] = "too-large"
+            return info
+
+        info["status"] = "bundled"
+        info["bundle"] = str(bundle_file)
+        return info
+    except Exception:
+        return info
+    finally:
+        for ref in stash_refs:
+            _git(repo, 'update-ref', '-d', ref)
+
+
+def export_git_bundles(projects_dir: Path, bundle_dir: Path, previous_bundle_dirs: list[Path] | None = None) -> list[dict]:
+    """Bundle unpushed work for every repo in projects_dir, in parallel. Returns one info dict per repo.
+
+    previous_bundle_dirs are the git_bundles/ folders of earlier snapshots, oldest first.
+    """
+    repos = collect_python_project_repos(projects_dir)
+    if not repos:
+        return []
+
+    def bundle_one(repo: dict) -> dict:
+        name = f"{repo['folder']}.bundle"
+        previous = [d / name for d in previous_bundle_dirs or []]
+        return export_git_bundle(projects_dir / repo['folder'], bundle_dir / name, previous)
+
+    with ThreadPoolExecutor(max_workers=GIT_BUNDLE_WORKERS) as pool:
+        return list(pool.map(bundle_one, repos))
+
+
+# ---- Retention ----
+# Monthly artifacts (snapshot-<MM-YY>/, installed_apps-<MM-YY>.txt, Brewfile-<MM-YY>) are
+# kept for the newest N months plus the newest month of each of the last M years.
+# Space is measured in allocated blocks with every inode counted once, so hardlinked
+# files shared between snapshots are not double-counted, and a pruned file only counts
+# as reclaimed when all of its links are being deleted.
+# Clones are different files sharing blocks (clonefile() on APFS, FICLONE reflinks on
+# Linux), so usage totals count those shared blocks once per clone. On macOS the
+# reclaim figure uses each file's private (unshared) size instead, which makes it a
+# lower bound; elsewhere it is overcounted for clones.
+
+KEEP_MONTHLY = 6
+KEEP_YEARLY = 5
+PRUNE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+_DATED_PREFIXES = ('snapshot-', 'installed_apps-', 'Brewfile-')
+
+# getattrlist() constants from <sys/attr.h>
+_ATTR_BIT_MAP_COUNT = 5
+_ATTR_CMN_RETURNED_ATTRS = 0x80000000
+_ATTR_CMNEXT_PRIVATESIZE = 0x00000008
+_FSOPT_NOFOLLOW = 0x00000001
+_FSOPT_ATTR_CMN_EXTENDED = 0x00000020
+
+
+class _AttrList(ctypes.Structure):
+    _fields_ = [
+        ('bitmapcount', ctypes.c_ushort),
+        ('reserved', ctypes.c_uint16),
+        ('commonattr', ctypes.c_uint32),
+        ('volattr', ctypes.c_uint32),
+        ('dirattr', ctypes.c_uint32),
+        ('fileattr', ctypes.c_uint32),
+        ('forkattr', ctypes.c_uint32),  # common extended attrs with FSOPT_ATTR_CMN_EXTENDED
+    ]
+
+
+class _PrivateSizeBuf(ctypes.Structure):
+    _pack_ = 4
+    _fields_ = [
+        ('length', ctypes.c_uint32),
+        ('returned', ctypes.c_uint32 * _ATTR_BIT_MAP_COUNT),
+        ('privatesize', ctypes.c_int64),
+    ]
+
+
+def _private_size(path: str) -> int | None:
+    """Bytes of path not shared with any clone (APFS only). None if unavailable."""
+    if _libc is None:
+        return None
+    attrs = _AttrList(bitmapcount=_ATTR_BIT_MAP_COUNT, commonattr=_ATTR_CMN_RETURNED_ATTRS,
+                      forkattr=_ATTR_CMNEXT_PRIVATESIZE)
+    buf = _PrivateSizeBuf()
+    try:
+        rc = _libc.getattrlist(os.fsencode(path), ctypes.byref(attrs), ctypes.byref(buf),
+                               ctypes.sizeof(buf), _FSOPT_NOFOLLOW | _FSOPT_ATTR_CMN_EXTENDED)
+    except Exception:
+        return None
+    # returned[4] is the forkattr slot, i.e. the common extended attributes
+    if rc != 0 or not buf.returned[4] & _ATTR_CMNEXT_PRIVATESIZE:
+        return None
+    return buf.privatesize
+
+
+def _item_month(p: Path) -> datetime | None:
+    """Return the month encoded in a dated artifact name, or None if p is not one."""
+    for prefix in _DATED_PREFIXES:
+        if p.name.startswith(prefix):
+            stamp = p.name[len(prefix):].removesuffix('.txt')
+            try:
+                return datetime.strptime(stamp, '%m-%y')
+            except ValueError:
+                return None
+    return None
+
+
+def format_size(nbytes: int) -> str:
+    """Format a byte count as B / KB / MB / GB for the retention report."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if nbytes < 1024 or unit == 'GB':
+            return f"{nbytes:.0f} {unit}" if unit == 'B' else f"{nbytes:.1f} {unit}"
+        nbytes /= 1024
+
+
+def _inode_usage(paths: list[Path]) -> dict:
+    """Map (st_dev, st_ino) -> [allocated bytes, st_nlink, links seen, first path] for everything under paths."""
+    inodes = {}
+
+    def add(p: str):
+        try:
+            st = os.lstat(p)
+        except OSError:
+            return
+        key = (st.st_dev, st.st_ino)
+        if key in inodes:
+            inodes[key][2] += 1
+        else:
+            # A directory's st_nlink counts its subdirectories, not hardlinks
+            nlink = 1 if stat.S_ISDIR(st.st_mode) else st.st_nlink
+            inodes[key] = [st.st_blocks * 512, nlink, 1, p]
+
+    for path in paths:
+        add(path)
+        if path.is_dir() and not path.is_symlink():
+            for root, dirs, files in os.walk(path):
+                for name in dirs + files:
+                    add(os.path.join(root, name))
+    return inodes
+
+
+def disk_usage(paths: list[Path]) -> int:
+    """Real disk usage of paths in bytes, counting each hardlinked inode once."""
+    return sum(entry[0] for entry in _inode_usage(paths).values())
+
+
+def plan_retention(output_dir: Path, keep_monthly: int = KEEP_MONTHLY, keep_yearly: int = KEEP_YEARLY) -> dict:
+    """Work out which dated artifacts in output_dir to keep and which to prune.
+
+    The git_bundles/ folder of a pruned snapshot is preserved, since later bundles are
+    incremental on top of it. The newest month is always kept, whatever keep_monthly is.
+    Returns {"keep", "prune", "preserve", "total_bytes", "reclaim_bytes"} where
+    keep/prune are {month: [paths]}.
+    """
+    by_month = {}
+    for p in output_dir.iterdir():
+        month = _item_month(p)
+        if month is not None:
+            by_month.setdefault(month, []).append(p)
+
+    months = sorted(by_month, reverse=True)
+    retained = set(months[:max(keep_monthly, 1)])
+    newest_per_year = {}
+    for month in months:
+        newest_per_year.setdefault(month.year, month)
+    retained.update(sorted(newest_per_year.values(), reverse=True)[:max(keep_yearly, 0)])
+
+    keep = {m: sorted(by_month[m]) for m in months if m in retained}
+    prune = {m: sorted(by_month[m]) for m in months if m not in retained}
+
+    preserve = []
+    for month, paths in list(prune.items()):
+        for p in list(paths):
+            bundles = p / 'git_bundles'
+            if p.name.startswith('snapshot-') and bundles.is_dir() and any(bundles.iterdir()):
+                if {c.name for c in p.iterdir()} <= {'git_bundles', INTEGRITY_MANIFEST}:
+                    paths.remove(p)  # already stripped down by an earlier prune
+                else:
+                    preserve.append(bundles)
+        if not paths:
+            del prune[month]
+
+    all_paths = [p for paths in by_month.values() for p in paths]
+    prune_paths = [p for paths in prune.values() for p in paths]
+    preserved_inodes = _inode_usage(preserve)
+    # The snapshot folder holding a preserved git_bundles/ is stripped, not deleted
+    surviving_dirs = set()
+    for bundles in preserve:
+        st = os.lstat(bundles.parent)
+        surviving_dirs.add((st.st_dev, st.st_ino))
+    reclaim = 0
+    for key, (usage, nlink, seen, path) in _inode_usage(prune_paths).items():
+        if key in surviving_dirs:
+            continue
+        # Reclaimed only if every link to the inode is inside the pruned set
+        if key in preserved_inodes:
+            seen -= preserved_inodes[key][2]
+        if seen >= nlink:
+            # Deleting a clone only frees the blocks it does not share
+            private = _private_size(path)
+            reclaim += usage if private is None else min(usage, private)
+
+    return {
+        "keep": keep,
+        "prune": prune,
+        "preserve": preserve,
+        "total_bytes": disk_usage(all_paths),
+        "reclaim_bytes": reclaim,
+    }
+
+
+def _remove_path(p: Path, preserve: set):
+    """Delete p; for snapshot folders, keep any child listed in preserve."""
+    if p.is_dir() and not p.is_symlink():
+        keep_children = {c for c in preserve if c.parent == p}
+        if not keep_children:
+            shutil.rmtree(p)
+            return
+        for child in p.iterdir():
+            if child in keep_children:
+                continue
+            if child.is_dir() and not child.is_symlink():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+        # Re-hash what is left so `verify` still works on the stripped snapshot
+        write_integrity_manifest(p)
+    else:
+        p.unlink()
+
+
+def prune_snapshots(plan: dict) -> list[str]:
+    """Delete everything plan marks for pruning, in parallel. Returns error messages, if any."""
+    preserve = set(plan["preserve"])
+    targets = [p for paths in plan["prune"].values() for p in paths]
+    errors = []
+    with ThreadPoolExecutor(max_workers=PRUNE_WORKERS) as pool:
+        futures = {p: pool.submit(_remove_path, p, preserve) for p in targets}
+        for p, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(f"{p.name}: {e}")
+    return errors
+
+
+def write_clone_projects_step(r, python_repos: list[dict], output_dir: Path, snapshot_names: list[str]):
+    """Write the README commands that clone ~/PythonProjects and replay the git bundles.
+
+    Repos without a remote are recreated with `git init`; their whole history comes
+    from the bundles. snapshot_names must be oldest first, since bundles are incremental.
+    """
+    r.write("```bash\n")
+    r.write("mkdir -p ~/PythonProjects && cd ~/PythonProjects\n\n")
+    local_only = [repo['folder'] for repo in python_repos if not repo['remote']]
+    if python_repos:
+        for repo in python_repos:
+            folder = repo['folder']
+            ssh = repo['ssh_remote']
+            # Quote folder name in case it has spaces
+            if repo['remote']:
+                r.write(f'git clone "{ssh}" "{folder}"\n')
+            else:
+                r.write(f'git init -q "{folder}"   # no remote: history comes from the git bundles below\n')
+    else:
+        r.write("# No git repos found in ~/PythonProjects at snapshot time\n")
+    r.write("```\n\n")
+    r.write("> Make sure SSH is set up first (step 14) and your key is added to GitHub before cloning via SSH.\n\n")
+    r.write("### Replay unpushed work from git bundles\n\n")
+    r.write("Each monthly snapshot has `git_bundles/<repo>.bundle` with commits, branches, tags and stashes that were never pushed.\n")
+    r.write("Bundles are incremental, so replay them oldest snapshot first, after cloning:\n\n")
+    r.write("```bash\n")
+    r.write("cd ~/PythonProjects\n")
+    r.write("n=0\n")
+    r.write(f"for snap in {' '.join(snapshot_names)}; do\n")
+    r.write("  n=$((n + 1))\n")
+    r.write(f'  for bundle in "{output_dir}/$snap/git_bundles/"*.bundle; do\n')
+    r.write('    [ -f "$bundle" ] || continue\n')
+    r.write('    git -C "$(basename "$bundle" .bundle)" fetch "$bundle" \\\n')
+    r.write("      '+refs/heads/*:refs/remotes/bundle/*' '+refs/tags/*:refs/tags/*' \\\n")
+    # Stashes go under a per-snapshot number so refname order is oldest month, then oldest stash
+    r.write(f'      "+{STASH_REF_PREFIX}/*:{STASH_REF_PREFIX}/$(printf %03d "$n")/*"\n')
+    r.write("  done\n")
+    r.write("done\n\n")
+    r.write("# Turn the bundled stashes back into real stashes, oldest first so stash@{0} is the newest again\n")
+    r.write("for repo in */; do\n")
+    r.write(f"  git -C \"$repo\" for-each-ref --sort=refname --format='%(refname)' {STASH_REF_PREFIX}/ | while read -r ref; do\n")
+    r.write('    git -C "$repo" stash store -m "restored from bundle" "$ref" && git -C "$repo" update-ref -d "$ref"\n')
+    r.write("  done\n")
+    r.write("done\n")
+    r.write("```\n\n")
+    r.write("Unpushed branches show up as `bundle/<branch>` — merge or check them out as needed, e.g. `git switch -c my-branch bundle/my-branch`.\n\n")
+    if local_only:
+        names = ', '.join(f"`{folder}`" for folder in local_only)
+        r.write(f"Repos with no remote ({names}) have no branch checked out yet — switch to one from the bundle, e.g. `git switch -c main bundle/main`.\n\n")
+
+
 def get_installed_apps():
     # Define the applications directory path
     apps_dir = "/Applications"
@@ -436,7 +1143,7 @@ def get_installed_apps():
     current_date = datetime.now().strftime("%m-%y")
 
     # Output folder in Dropbox
-    output_dir = Path(os.path.expanduser("~/Library/CloudStorage/Dropbox/Mac Installed Apps"))
+    output_dir = OUTPUT_DIR
     output_dir.mkdir(parents=True, exist_ok=True)
 
     output_file = output_dir / f"installed_apps-{current_date}.txt"
@@ -515,6 +1222,13 @@ def get_installed_apps():
             r.write(f'   `{output_dir}/README-Reinstall.md`\n')
             r.write("4. Once that folder is synced, proceed to step 2\n\n")
             r.write("> **Shortcut:** If Dropbox is slow, you can also clone `github.com/alexkharrod/app_lister` and use the static `Brewfile` in that repo for step 3, then come back for the snapshot files once Dropbox catches up.\n\n")
+            r.write("### Optional: check the snapshot is complete\n\n")
+            r.write("The checker lives in the app_lister repo, not in Dropbox. Clone it over HTTPS (SSH is not set up yet) and run:\n\n")
+            r.write("```bash\n")
+            r.write("git clone https://github.com/alexkharrod/app_lister.git ~/app_lister\n")
+            r.write(f'python3 ~/app_lister/app_lister.py verify "{output_dir}/{snapshot_subdir}"\n')
+            r.write("```\n\n")
+            r.write("It lists any missing or corrupted files; wait for Dropbox to finish syncing and re-run if it reports problems.\n\n")
 
             r.write("## 2. Install Homebrew\n\n")
             r.write("```bash\n")
@@ -673,18 +1387,10 @@ def get_installed_apps():
             r.write("- `com.logoinluded.ptool-backup.plist` — nightly DB backup to Dropbox\n\n")
 
             r.write("## 18. Clone Python Projects\n\n")
-            r.write("```bash\n")
-            r.write("mkdir -p ~/PythonProjects && cd ~/PythonProjects\n\n")
-            if python_repos:
-                for repo in python_repos:
-                    folder = repo['folder']
-                    ssh = repo['ssh_remote']
-                    # Quote folder name in case it has spaces
-                    r.write(f'git clone "{ssh}" "{folder}"\n')
-            else:
-                r.write("# No git repos found in ~/PythonProjects at snapshot time\n")
-            r.write("```\n\n")
-            r.write("> Make sure SSH is set up first (step 14) and your key is added to GitHub before cloning via SSH.\n\n")
+            snapshot_names = [p.name for p in find_snapshots(output_dir)]
+            if snapshot_subdir not in snapshot_names:
+                snapshot_names.append(snapshot_subdir)
+            write_clone_projects_step(r, python_repos, output_dir, snapshot_names)
 
             r.write("## 19. ptool (Internal Product Tool) Setup\n\n")
             r.write("```bash\n")
@@ -730,9 +1436,102 @@ def get_installed_apps():
         
         snapshot_results = export_env_snapshot(output_dir, current_date)
         print(f"Created environment snapshot folder: {snapshot_results['snapshot_dir']}")
+        print(snapshot_results['copy_stats'])
+        integrity = snapshot_results.get('integrity')
+        if integrity:
+            print(f"Wrote {INTEGRITY_MANIFEST}: {integrity['files']} files "
+                  f"({integrity['hashed']} hashed, {integrity['reused']} reused from previous run)")
+        print(f"Dropbox folder usage: {format_size(disk_usage(list(output_dir.iterdir())))} "
+              f"(run `python app_lister.py prune` to see what old snapshots could be removed)")
         
     except Exception as e:
         print(f"An error occurred: {e}")
 
+def cmd_verify(snapshot_dir: Path | None = None) -> int:
+    """Verify a snapshot (default: the newest one) against its MANIFEST.json. Returns an exit code."""
+    if snapshot_dir is None:
+        snapshots = find_snapshots(OUTPUT_DIR)
+        if not snapshots:
+            print(f"No snapshots found in {OUTPUT_DIR}")
+            return 1
+        snapshot_dir = snapshots[-1]
+
+    try:
+        report = verify_snapshot(snapshot_dir)
+    except FileNotFoundError as e:
+        print(e)
+        return 1
+
+    print(f"Verified {snapshot_dir}")
+    print(f"  OK:        {len(report['ok'])}")
+    for key in ('missing', 'extra', 'corrupted'):
+        print(f"  {key.capitalize() + ':':<10} {len(report[key])}")
+        for rel in report[key]:
+            print(f"    {rel}")
+    return 1 if report['missing'] or report['corrupted'] else 0
+
+
+def cmd_prune(keep_monthly: int, keep_yearly: int, apply: bool, output_dir: Path = OUTPUT_DIR) -> int:
+    """Print the retention report and, if apply is set, delete the pruned artifacts. Returns an exit code."""
+    if not output_dir.exists():
+        print(f"{output_dir} does not exist")
+        return 1
+    plan = plan_retention(output_dir, keep_monthly, keep_yearly)
+
+    print(f"Retention for {output_dir} (last {keep_monthly} months + newest of last {keep_yearly} years)")
+    print(f"  Current usage: {format_size(plan['total_bytes'])}")
+    for label, months in (('Keep', plan['keep']), ('Prune', plan['prune'])):
+        print(f"  {label}:")
+        if not months:
+            print("    (nothing)")
+        for month, paths in months.items():
+            names = ', '.join(p.name for p in paths)
+            print(f"    {month.strftime('%m-%y')}  {format_size(disk_usage(paths)):>9}  {names}")
+    for bundles in plan['preserve']:
+        print(f"  Preserving {bundles.parent.name}/git_bundles (later bundles build on it)")
+    if _libc is not None:
+        print(f"  Reclaimable: at least {format_size(plan['reclaim_bytes'])} (private size of APFS clones)")
+        print("  Note: usage figures count blocks shared between APFS clones once per clone.")
+    else:
+        print(f"  Reclaimable: {format_size(plan['reclaim_bytes'])}")
+        print("  Note: blocks shared between reflinked clones are counted once per clone.")
+
+    if not plan['prune']:
+        return 0
+    if not apply:
+        print("Dry run — re-run with --apply to delete.")
+        return 0
+
+    errors = prune_snapshots(plan)
+    for err in errors:
+        print(f"  Failed to delete {err}")
+    print(f"Pruned {len(plan['prune'])} months, now using {format_size(disk_usage(list(output_dir.iterdir())))}")
+    return 1 if errors else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="List installed Mac apps and snapshot the environment to Dropbox.")
+    sub = parser.add_subparsers(dest='command')
+    verify_p = sub.add_parser('verify', help="re-hash a snapshot and compare it against its MANIFEST.json")
+    verify_p.add_argument('snapshot', nargs='?', type=Path, help="snapshot folder (default: newest in Dropbox)")
+    prune_p = sub.add_parser('prune', help="delete old snapshots, reports and Brewfiles (dry run unless --apply)")
+    prune_p.add_argument('--keep-monthly', type=int, default=KEEP_MONTHLY, help=f"newest months to keep (default {KEEP_MONTHLY})")
+    prune_p.add_argument('--keep-yearly', type=int, default=KEEP_YEARLY, help=f"years to keep one month for (default {KEEP_YEARLY})")
+    prune_p.add_argument('--apply', action='store_true', help="actually delete; without it only the report is shown")
+    args = parser.parse_args(argv)
+
+    if args.command == 'prune':
+        if args.keep_monthly < 1:
+            parser.error("--keep-monthly must be at least 1 (the current month is always kept)")
+        if args.keep_yearly < 0:
+            parser.error("--keep-yearly must not be negative")
+    if args.command == 'verify':
+        return cmd_verify(args.snapshot)
+    if args.command == 'prune':
+        return cmd_prune(args.keep_monthly, args.keep_yearly, args.apply)
+    get_installed_apps()
+    return 0
+
+
 if __name__ == "__main__":
-    get_installed_apps()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
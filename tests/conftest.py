@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# app_lister is a single script at the repo root, not an installed package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def git_env(monkeypatch, tmp_path):
+    """Isolate git from the user's config and give it a fixed identity."""
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', str(tmp_path / 'gitconfig'))
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+    for var in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(var, 'Test')
+    for var in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(var, 'test@example.com')
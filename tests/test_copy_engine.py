@@ -0,0 +1,122 @@
+import os
+import shutil
+
+import pytest
+
+import app_lister
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    app_lister.reset_copy_stats()
+    yield
+    app_lister.reset_copy_stats()
+
+
+@pytest.fixture
+def no_clone(monkeypatch):
+    """Force the non-clone paths, whatever filesystem the tests run on."""
+    monkeypatch.setattr(app_lister, '_clone_file', lambda src, dst: False)
+
+
+def test_falls_back_to_kernel_copy(tmp_path, no_clone):
+    src = tmp_path / 'src.bin'
+    src.write_bytes(os.urandom(300_000))
+    dst = tmp_path / 'dst.bin'
+    assert app_lister.copy_file_fast(src, dst) == 'kernel'
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_falls_back_to_buffered_when_kernel_copy_fails(tmp_path, no_clone, monkeypatch):
+    def unsupported(*args):
+        raise OSError(95, 'Operation not supported')
+
+    monkeypatch.setattr(os, 'copy_file_range', unsupported, raising=False)
+    monkeypatch.setattr(os, 'sendfile', unsupported, raising=False)
+    src = tmp_path / 'src.bin'
+    src.write_bytes(os.urandom(300_000))
+    dst = tmp_path / 'dst.bin'
+    assert app_lister.copy_file_fast(src, dst) == 'buffered'
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_empty_file_uses_buffered(tmp_path, no_clone):
+    src = tmp_path / 'empty'
+    src.touch()
+    dst = tmp_path / 'copy'
+    assert app_lister.copy_file_fast(src, dst) == 'buffered'
+    assert dst.read_bytes() == b''
+
+
+def test_real_filesystem_copy_matches(tmp_path):
+    # No patching: clone where supported (btrfs/xfs/APFS), kernel copy otherwise
+    src = tmp_path / 'src.bin'
+    src.write_bytes(os.urandom(100_000))
+    dst = tmp_path / 'dst.bin'
+    assert app_lister.copy_file_fast(src, dst) in ('clone', 'kernel')
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_special_files_are_refused(tmp_path):
+    fifo = tmp_path / 'pipe'
+    os.mkfifo(fifo)
+    with pytest.raises(shutil.SpecialFileError):
+        app_lister.copy_file_fast(fifo, tmp_path / 'copy')
+    assert app_lister.safe_copy_file(fifo, tmp_path / 'out') is False
+
+
+def test_copy_dir_skips_fifos_and_broken_links_and_keeps_metadata(tmp_path, no_clone):
+    src = tmp_path / 'snippets'
+    (src / 'nested').mkdir(parents=True)
+    (src / 'a.json').write_text('{}')
+    (src / 'nested' / 'b.json').write_text('[]')
+    (src / 'nested' / 'b.json').chmod(0o600)
+    os.mkfifo(src / 'pipe')
+    (src / 'broken').symlink_to(src / 'missing')
+    (src / 'link.json').symlink_to(src / 'a.json')
+    os.utime(src / 'a.json', ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+    os.utime(src / 'nested', ns=(1_100_000_000_000_000_000, 1_100_000_000_000_000_000))
+    os.utime(src, ns=(1_200_000_000_000_000_000, 1_200_000_000_000_000_000))
+
+    assert app_lister.safe_copy_dir(src, tmp_path / 'dest') is True
+
+    target = tmp_path / 'dest' / 'snippets'
+    assert sorted(p.name for p in target.iterdir()) == ['a.json', 'link.json', 'nested']
+    assert not (target / 'link.json').is_symlink()  # followed, as shutil.copytree does
+    assert (target / 'link.json').read_text() == '{}'
+    assert (target / 'a.json').stat().st_mtime_ns == (src / 'a.json').stat().st_mtime_ns
+    assert (target / 'nested' / 'b.json').stat().st_mode & 0o777 == 0o600
+    assert (target / 'nested').stat().st_mtime_ns == (src / 'nested').stat().st_mtime_ns
+    assert target.stat().st_mtime_ns == src.stat().st_mtime_ns
+
+
+def test_copy_stats_count_files_and_strategies(tmp_path, no_clone):
+    src = tmp_path / 'fonts'
+    src.mkdir()
+    for i in range(5):
+        (src / f"font{i}.otf").write_bytes(b'x' * 1024 * 1024)
+    (src / 'empty').touch()
+
+    assert app_lister.safe_copy_dir(src, tmp_path / 'dest')
+    summary = app_lister.copy_stats_summary()
+    assert summary.startswith('Copy engine: 6 files in ')
+    assert '5.0 MB copied' in summary
+    assert 'buffered x1 (0.0 MB)' in summary
+    assert 'kernel x5 (5.0 MB)' in summary
+
+    app_lister.reset_copy_stats()
+    assert app_lister.copy_stats_summary() == 'Copy engine: no files copied'
+
+
+def test_clone_bytes_are_not_counted_as_copied():
+    app_lister._record_copy('clone', 50 * 1024 * 1024)
+    app_lister._record_copy('kernel', 1024 * 1024)
+    with app_lister._copy_stats_lock:
+        app_lister._copy_stats['seconds'] = 1.0
+    summary = app_lister.copy_stats_summary()
+    assert '1.0 MB copied (1.0 MB/s)' in summary
+    assert 'clone x1 (50.0 MB)' in summary
+
+    app_lister.reset_copy_stats()
+    app_lister._record_copy('clone', 50 * 1024 * 1024)
+    assert '0.0 MB copied (n/a)' in app_lister.copy_stats_summary()
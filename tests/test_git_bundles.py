@@ -0,0 +1,158 @@
+import io
+import os
+import re
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import app_lister
+
+
+def git(repo: Path, *args: str) -> str:
+    result = subprocess.run(['git', '-C', str(repo), *args], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+def commit(repo: Path, message: str):
+    git(repo, 'commit', '-q', '--allow-empty', '-m', message)
+
+
+@pytest.fixture
+def workspace(tmp_path, git_env):
+    """A bare "remote", a ~/PythonProjects with one clone of it, and a Dropbox output dir."""
+    remote = tmp_path / 'remote.git'
+    subprocess.run(['git', 'init', '-q', '--bare', '-b', 'main', str(remote)], check=True)
+    projects = tmp_path / 'PythonProjects'
+    work = projects / 'work'
+    subprocess.run(['git', 'clone', '-q', str(remote), str(work)], check=True, capture_output=True)
+    git(work, 'checkout', '-q', '-b', 'main')
+    (work / 'f.txt').write_text('one\n')
+    git(work, 'add', 'f.txt')
+    commit(work, 'pushed')
+    git(work, 'push', '-q', 'origin', 'main')
+    output = tmp_path / 'out'
+    output.mkdir()
+    return remote, projects, work, output
+
+
+def export_month(projects: Path, output: Path, month: str) -> dict:
+    """Run the bundle export the way export_env_snapshot() does for snapshot-<month>."""
+    snapshot = output / f"snapshot-{month}"
+    previous = [p / 'git_bundles' for p in app_lister.find_snapshots(output) if p != snapshot]
+    snapshot.mkdir(exist_ok=True)
+    infos = app_lister.export_git_bundles(projects, snapshot / 'git_bundles', previous)
+    return {info['name']: info for info in infos}
+
+
+def readme_restore(projects: Path, output: Path, home: Path) -> Path:
+    """Run the clone + bundle replay commands from README-Reinstall.md in a fresh $HOME."""
+    r = io.StringIO()
+    snapshot_names = [p.name for p in app_lister.find_snapshots(output)]
+    app_lister.write_clone_projects_step(r, app_lister.collect_python_project_repos(projects), output, snapshot_names)
+    script = '\n'.join(re.findall(r"```bash\n(.*?)```", r.getvalue(), re.S))
+    home.mkdir()
+    subprocess.run(['bash', '-e', '-c', script], env={**os.environ, 'HOME': str(home)},
+                   check=True, capture_output=True, text=True)
+    return home / 'PythonProjects'
+
+
+def test_bundles_are_incremental_and_replay_onto_fresh_clone(workspace, tmp_path):
+    remote, projects, work, output = workspace
+
+    # Month 1: unpushed commit, a stash and an annotated tag
+    commit(work, 'local 1')
+    (work / 'f.txt').write_text('stashed\n')
+    git(work, 'stash', 'push', '-q')
+    git(work, 'tag', '-a', 'v1', '-m', 'release 1')
+    info = export_month(projects, output, '01-26')['work']
+    assert info['status'] == 'bundled'
+    # Temporary stash refs must not be left behind in the user's repo
+    assert git(work, 'for-each-ref', f"{app_lister.STASH_REF_PREFIX}/") == ''
+
+    # Month 2: nothing new
+    assert export_month(projects, output, '02-26')['work']['status'] == 'up-to-date'
+
+    # Month 3: one more commit; the stash and tag from month 1 are not bundled again
+    commit(work, 'local 2')
+    info = export_month(projects, output, '03-26')['work']
+    assert info['status'] == 'bundled'
+    assert info['commits'] == 1
+    heads = git(work, 'bundle', 'list-heads', info['bundle'])
+    assert 'refs/heads/main' in heads
+    assert 'refs/tags/v1' not in heads
+    assert app_lister.STASH_REF_PREFIX not in heads
+
+    clone = readme_restore(projects, output, tmp_path / 'newhome') / 'work'
+
+    assert git(clone, 'rev-parse', 'bundle/main') == git(work, 'rev-parse', 'main')
+    assert git(clone, 'rev-parse', 'v1') == git(work, 'rev-parse', 'v1')
+    assert git(clone, 'rev-parse', 'stash@{0}') == git(work, 'rev-parse', 'stash@{0}')
+    assert git(clone, 'for-each-ref', f"{app_lister.STASH_REF_PREFIX}/") == ''
+
+
+def test_same_month_rerun_rebuilds_bundle(workspace):
+    remote, projects, work, output = workspace
+    commit(work, 'local 1')
+    export_month(projects, output, '01-26')
+
+    commit(work, 'local 2')
+    info = export_month(projects, output, '01-26')['work']
+    assert info['status'] == 'bundled'
+    # A re-run must not treat its own earlier bundle as a previous month
+    assert info['commits'] == 2
+    heads = git(work, 'bundle', 'list-heads', info['bundle'])
+    assert git(work, 'rev-parse', 'main') in heads
+
+
+def test_repo_already_on_remote_is_up_to_date(workspace):
+    remote, projects, work, output = workspace
+    info = export_month(projects, output, '01-26')['work']
+    assert info['status'] == 'up-to-date'
+    assert not (output / 'snapshot-01-26' / 'git_bundles' / 'work.bundle').exists()
+
+
+def test_bundle_over_size_cap_is_dropped(workspace, tmp_path):
+    remote, projects, work, output = workspace
+    commit(work, 'local 1')
+    bundle = tmp_path / 'work.bundle'
+    info = app_lister.export_git_bundle(work, bundle, max_bytes=1)
+    assert info['status'] == 'too-large'
+    assert not bundle.exists()
+
+
+def test_stash_order_survives_restore(workspace, tmp_path):
+    remote, projects, work, output = workspace
+    for content in ('first\n', 'second\n'):
+        (work / 'f.txt').write_text(content)
+        git(work, 'stash', 'push', '-q', '-m', content.strip())
+    export_month(projects, output, '01-26')
+
+    # A third stash the next month, while the older two stay unchanged
+    (work / 'f.txt').write_text('third\n')
+    git(work, 'stash', 'push', '-q', '-m', 'third')
+    export_month(projects, output, '02-26')
+
+    clone = readme_restore(projects, output, tmp_path / 'newhome') / 'work'
+    original = git(work, 'stash', 'list', '--format=%H').split()
+    assert len(original) == 3
+    assert git(clone, 'stash', 'list', '--format=%H').split() == original
+
+
+def test_repo_without_remote_is_restored_from_bundles(workspace, tmp_path):
+    remote, projects, work, output = workspace
+    local = projects / 'scratch'
+    subprocess.run(['git', 'init', '-q', '-b', 'main', str(local)], check=True)
+    commit(local, 'never pushed 1')
+    git(local, 'tag', 'v0')
+    assert export_month(projects, output, '01-26')['scratch']['status'] == 'bundled'
+    commit(local, 'never pushed 2')
+    info = export_month(projects, output, '02-26')['scratch']
+    assert info['status'] == 'bundled'
+    assert info['commits'] == 1
+
+    restored = readme_restore(projects, output, tmp_path / 'newhome')
+    assert git(restored / 'scratch', 'rev-parse', 'bundle/main') == git(local, 'rev-parse', 'main')
+    assert git(restored / 'scratch', 'rev-parse', 'v0') == git(local, 'rev-parse', 'v0')
+    # The repo with a remote is still cloned as usual
+    assert git(restored / 'work', 'remote', 'get-url', 'origin') == str(remote)
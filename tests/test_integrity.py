@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pytest
+
+import app_lister
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    snap = tmp_path / 'snapshot-01-26'
+    (snap / 'shell').mkdir(parents=True)
+    (snap / 'shell' / '.zshrc').write_text('export EDITOR=vim\n')
+    (snap / 'vscode').mkdir()
+    (snap / 'vscode' / 'settings.json').write_text('{"editor.fontSize": 13}\n')
+    (snap / 'MANIFEST.md').write_text('# Environment Snapshot\n')
+    return snap
+
+
+def test_manifest_records_size_and_hash(snapshot):
+    stats = app_lister.write_integrity_manifest(snapshot)
+    assert stats['files'] == 3
+    assert stats['hashed'] == 3
+
+    manifest = json.loads((snapshot / app_lister.INTEGRITY_MANIFEST).read_text())
+    assert manifest['algorithm'] == 'blake2b'
+    entry = manifest['files']['shell/.zshrc']
+    data = (snapshot / 'shell' / '.zshrc').read_bytes()
+    assert entry['size'] == len(data)
+    assert entry['hash'] == hashlib.blake2b(data).hexdigest()
+    assert app_lister.INTEGRITY_MANIFEST not in manifest['files']
+
+
+def test_rerun_reuses_hashes_of_unchanged_files(snapshot):
+    app_lister.write_integrity_manifest(snapshot)
+    (snapshot / 'shell' / '.zshrc').write_text('export EDITOR=nano and longer\n')
+    stats = app_lister.write_integrity_manifest(snapshot)
+    assert (stats['files'], stats['hashed'], stats['reused']) == (3, 1, 2)
+
+
+def test_next_month_reuses_hashes_from_previous_snapshot(snapshot, tmp_path):
+    app_lister.write_integrity_manifest(snapshot)
+
+    # The next monthly run copies the same sources with mtimes preserved
+    next_month = tmp_path / 'snapshot-02-26'
+    shutil.copytree(snapshot, next_month)
+    (next_month / app_lister.INTEGRITY_MANIFEST).unlink()
+    (next_month / 'MANIFEST.md').write_text('# Environment Snapshot (02-26)\n')
+
+    stats = app_lister.write_integrity_manifest(next_month, previous_snapshot=snapshot)
+    assert stats['hashed'] == 1  # only MANIFEST.md changed
+    assert stats['reused'] == 2
+    assert app_lister.verify_snapshot(next_month)['corrupted'] == []
+
+
+def test_previous_snapshot_with_other_algorithm_is_ignored(snapshot, tmp_path):
+    app_lister.write_integrity_manifest(snapshot, algorithm='sha256')
+    next_month = tmp_path / 'snapshot-02-26'
+    shutil.copytree(snapshot, next_month)
+    stats = app_lister.write_integrity_manifest(next_month, previous_snapshot=snapshot)
+    assert stats['reused'] == 0
+
+
+def test_mmap_and_chunked_hashing_agree(tmp_path, monkeypatch):
+    big = tmp_path / 'big.bin'
+    big.write_bytes(os.urandom(app_lister.MMAP_THRESHOLD + 12345))
+    mapped = app_lister.hash_file(big)
+    monkeypatch.setattr(app_lister, 'MMAP_THRESHOLD', big.stat().st_size + 1)
+    chunked = app_lister.hash_file(big)
+    assert mapped == chunked == hashlib.blake2b(big.read_bytes()).hexdigest()
+
+
+def test_verify_clean_snapshot(snapshot):
+    app_lister.write_integrity_manifest(snapshot)
+    report = app_lister.verify_snapshot(snapshot)
+    assert report['ok'] == ['MANIFEST.md', 'shell/.zshrc', 'vscode/settings.json']
+    assert report['missing'] == report['extra'] == report['corrupted'] == []
+
+
+def test_verify_reports_missing_extra_and_corrupted(snapshot, monkeypatch):
+    app_lister.write_integrity_manifest(snapshot)
+    (snapshot / 'MANIFEST.md').unlink()
+    (snapshot / 'stray.txt').write_text('not in manifest\n')
+    # Same size, different content: only a hash can catch it
+    zshrc = snapshot / 'shell' / '.zshrc'
+    zshrc.write_text(zshrc.read_text().replace('vim', 'ed!'))
+    # Different size: reported without hashing
+    (snapshot / 'vscode' / 'settings.json').write_text('{}\n')
+
+    hashed = []
+    real_hash_file = app_lister.hash_file
+    monkeypatch.setattr(app_lister, 'hash_file', lambda p, a='blake2b': hashed.append(p.name) or real_hash_file(p, a))
+
+    report = app_lister.verify_snapshot(snapshot)
+    assert report['missing'] == ['MANIFEST.md']
+    assert report['extra'] == ['stray.txt']
+    assert report['corrupted'] == ['shell/.zshrc', 'vscode/settings.json']
+    assert report['ok'] == []
+    assert hashed == ['.zshrc']
+
+
+def test_verify_without_manifest_raises(snapshot):
+    with pytest.raises(FileNotFoundError):
+        app_lister.verify_snapshot(snapshot)
+
+
+def test_cmd_verify_exit_codes(snapshot, capsys):
+    assert app_lister.cmd_verify(snapshot) == 1  # no manifest yet
+    app_lister.write_integrity_manifest(snapshot)
+    assert app_lister.cmd_verify(snapshot) == 0
+    (snapshot / 'shell' / '.zshrc').unlink()
+    assert app_lister.main(['verify', str(snapshot)]) == 1
+    assert 'shell/.zshrc' in capsys.readouterr().out
@@ -0,0 +1,109 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import app_lister
+
+
+def make_month(output: Path, month: str, payload: int = 64 * 1024) -> Path:
+    """Create snapshot-<month>/, installed_apps-<month>.txt and Brewfile-<month>."""
+    snapshot = output / f"snapshot-{month}"
+    (snapshot / 'shell').mkdir(parents=True)
+    (snapshot / 'shell' / '.zshrc').write_bytes(os.urandom(payload))
+    (output / f"installed_apps-{month}.txt").write_text('Safari.app\n')
+    (output / f"Brewfile-{month}").write_text('brew "git"\n')
+    return snapshot
+
+
+def month_names(months: dict) -> list[str]:
+    return [m.strftime('%m-%y') for m in months]
+
+
+@pytest.fixture
+def output(tmp_path):
+    out = tmp_path / 'Mac Installed Apps'
+    out.mkdir()
+    (out / 'README-Reinstall.md').write_text('# not a dated artifact\n')
+    for month in ['03-23', '12-23', '06-24', '11-24', '12-24', '05-25', '06-25', '07-25']:
+        make_month(out, month)
+    return out
+
+
+def test_keeps_newest_months_plus_newest_of_each_year(output):
+    plan = app_lister.plan_retention(output, keep_monthly=2, keep_yearly=2)
+    assert month_names(plan['keep']) == ['07-25', '06-25', '12-24']
+    assert month_names(plan['prune']) == ['05-25', '11-24', '06-24', '12-23', '03-23']
+    assert [p.name for p in plan['keep'][max(plan['keep'])]] == [
+        'Brewfile-07-25', 'installed_apps-07-25.txt', 'snapshot-07-25']
+
+
+def test_newest_month_is_always_kept(output):
+    plan = app_lister.plan_retention(output, keep_monthly=0, keep_yearly=0)
+    assert month_names(plan['keep']) == ['07-25']
+
+
+def test_hardlink_shared_with_kept_month_is_not_reclaimable(output):
+    shared = output / 'snapshot-07-25' / 'big.bin'
+    shared.write_bytes(os.urandom(1024 * 1024))
+    os.link(shared, output / 'snapshot-03-23' / 'big.bin')
+
+    plan = app_lister.plan_retention(output, keep_monthly=2, keep_yearly=2)
+    pruned = [p for paths in plan['prune'].values() for p in paths]
+    assert plan['reclaim_bytes'] < 1024 * 1024
+    assert plan['reclaim_bytes'] == app_lister.disk_usage(pruned) - shared.stat().st_blocks * 512
+    # Counted once in the total, not once per link
+    everything = [p for p in output.iterdir() if p.name != 'README-Reinstall.md']
+    assert plan['total_bytes'] == app_lister.disk_usage(everything)
+
+
+def test_prune_keeps_git_bundles_and_rewrites_manifest(output):
+    bundles = output / 'snapshot-06-24' / 'git_bundles'
+    bundles.mkdir()
+    (bundles / 'work.bundle').write_bytes(b'bundle bytes')
+    app_lister.write_integrity_manifest(output / 'snapshot-06-24')
+
+    plan = app_lister.plan_retention(output, keep_monthly=2, keep_yearly=2)
+    assert plan['preserve'] == [bundles]
+    # Neither the bundles nor the snapshot folder that keeps them are reclaimed
+    pruned = [p for paths in plan['prune'].values() for p in paths]
+    kept_folder = (output / 'snapshot-06-24').stat().st_blocks * 512
+    assert plan['reclaim_bytes'] == app_lister.disk_usage(pruned) - app_lister.disk_usage([bundles]) - kept_folder
+    assert app_lister.prune_snapshots(plan) == []
+
+    remaining = sorted(p.name for p in output.iterdir())
+    assert remaining == [
+        'Brewfile-06-25', 'Brewfile-07-25', 'Brewfile-12-24', 'README-Reinstall.md',
+        'installed_apps-06-25.txt', 'installed_apps-07-25.txt', 'installed_apps-12-24.txt',
+        'snapshot-06-24', 'snapshot-06-25', 'snapshot-07-25', 'snapshot-12-24',
+    ]
+    stripped = output / 'snapshot-06-24'
+    assert sorted(p.name for p in stripped.iterdir()) == [app_lister.INTEGRITY_MANIFEST, 'git_bundles']
+    report = app_lister.verify_snapshot(stripped)
+    assert report['ok'] == ['git_bundles/work.bundle']
+    assert not (report['missing'] or report['extra'] or report['corrupted'])
+
+    # A second prune leaves the stripped snapshot alone
+    again = app_lister.plan_retention(output, keep_monthly=2, keep_yearly=2)
+    assert again['prune'] == {}
+    assert again['reclaim_bytes'] == 0
+    app_lister.prune_snapshots(again)
+    assert (stripped / 'git_bundles' / 'work.bundle').exists()
+
+
+@pytest.mark.parametrize('args', [
+    ['prune', '--keep-monthly', '0'],
+    ['prune', '--keep-monthly', '-1'],
+    ['prune', '--keep-yearly', '-1'],
+])
+def test_prune_rejects_invalid_counts(args):
+    with pytest.raises(SystemExit) as exc:
+        app_lister.main(args)
+    assert exc.value.code == 2
+
+
+def test_prune_dry_run_deletes_nothing(output, capsys):
+    before = sorted(p.name for p in output.iterdir())
+    assert app_lister.cmd_prune(2, 2, apply=False, output_dir=output) == 0
+    assert sorted(p.name for p in output.iterdir()) == before
+    assert 'Dry run' in capsys.readouterr().out